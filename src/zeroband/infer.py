@@ -325,7 +325,7 @@ def inference(config: Config):
         monitor.log({"rewards/batch_rewards": batch_rewards})
         logger.info(f"Average reward of the batch: {batch_rewards}")
 
-        # Get parquet table (add acceptance_metadata if needed)
+        # Get parquet table (acceptance_metadata is not part of pa_schema and is not written)
         table = get_parquet_table(
             accepted_outputs,
             accepted_rewards,
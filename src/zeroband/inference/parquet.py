@@ -1,9 +1,15 @@
+from array import array
+
+import numpy as np
 import pyarrow as pa
 from vllm import RequestOutput
 
 from zeroband.inference.rewards import RequestRewards
 from zeroband.utils.parquet import pa_schema
 
+# Arrow type of every schema field, resolved once instead of on every step
+_FIELD_TYPES = [(field.name, field.type) for field in pa_schema]
+
 
 def get_parquet_table(
     request_outputs: list[RequestOutput],
@@ -14,32 +20,86 @@ def get_parquet_table(
     target_lengths: list[int],
     acceptance_metadata: list[dict] = None,
 ) -> pa.Table:
-    # Iterator over proofs
-    proof_iter = iter(proofs)
-
-    # Create flattened list of records for PyArrow table
-    records = []
-    meta_iter = iter(acceptance_metadata) if acceptance_metadata is not None else None
-    for request_output, request_rewards, prompt, target_length in zip(request_outputs, request_rewards, prompts, target_lengths):
-        assert request_output.request_id == request_rewards.request_id
-        for output, reward in zip(request_output.outputs, request_rewards.rewards):
+    """
+    Build the parquet table of one inference step, with one row per completion.
+
+    acceptance_metadata is accepted for API compatibility but ignored: pa_schema has no such field, so it is never written.
+    """
+    # Materialize the per-request zip once so the flattened columns can be pre-allocated
+    requests = list(zip(request_outputs, request_rewards, prompts, target_lengths))
+    num_rows = sum(len(request_output.outputs) for request_output, *_ in requests)
+
+    # Create flattened columns for PyArrow table
+    # Token columns are kept as flat int32 buffers plus offsets to build list arrays without per-row type inference
+    input_tokens_flat, input_tokens_lens = array("i"), [0] * num_rows
+    output_tokens_flat, output_tokens_lens = array("i"), [0] * num_rows
+    prompt_col, completion_col = [None] * num_rows, [None] * num_rows
+    # Reward columns are filled into float32 buffers that Arrow wraps without copying
+    advantages_col, rewards_col = np.empty(num_rows, dtype=np.float32), np.empty(num_rows, dtype=np.float32)
+    task_rewards_col, length_penalties_col = np.empty(num_rows, dtype=np.float32), np.empty(num_rows, dtype=np.float32)
+    target_lengths_col, task_type_col = [None] * num_rows, [None] * num_rows
+    i = 0
+    for request_output, request_reward, prompt, target_length in requests:
+        assert request_output.request_id == request_reward.request_id
+        assert len(request_output.outputs) == len(request_reward.rewards)
+        prompt_token_ids = request_output.prompt_token_ids
+        task_type = request_reward.task_type
+        for output, reward in zip(request_output.outputs, request_reward.rewards):
             assert output.index == reward.completion_id
-            record = {
-                "input_tokens": request_output.prompt_token_ids,
-                "output_tokens": output.token_ids,
-                "prompt": prompt,
-                "completion": output.text,
-                "advantages": reward.advantage,
-                "rewards": reward.reward,
-                "task_rewards": reward.task_reward,
-                "length_penalties": reward.length_penalty,
-                "proofs": next(proof_iter) if len(output.token_ids) > 1 else b"",
-                "step": step,
-                "target_lengths": target_length,
-                "task_type": request_rewards.task_type,
-            }
-            if meta_iter is not None:
-                record["acceptance_metadata"] = next(meta_iter)
-            records.append(record)
-
-    return pa.Table.from_pylist(records, schema=pa_schema)
+            input_tokens_flat.extend(prompt_token_ids)
+            input_tokens_lens[i] = len(prompt_token_ids)
+            output_tokens_flat.extend(output.token_ids)
+            output_tokens_lens[i] = len(output.token_ids)
+            prompt_col[i] = prompt
+            completion_col[i] = output.text
+            advantages_col[i] = reward.advantage
+            rewards_col[i] = reward.reward
+            task_rewards_col[i] = reward.task_reward
+            length_penalties_col[i] = reward.length_penalty
+            target_lengths_col[i] = target_length
+            task_type_col[i] = task_type
+            i += 1
+
+    input_tokens_offsets = _build_token_offsets(input_tokens_lens)
+    output_tokens_offsets = _build_token_offsets(output_tokens_lens)
+
+    # Proofs are only generated for completions with more than one output token; place them in one pass
+    proofs_col = [b""] * num_rows
+    proof_rows = np.flatnonzero(np.diff(output_tokens_offsets) > 1)
+    assert len(proofs) >= len(proof_rows), "Not enough proofs for the generated completions"
+    for row, proof in zip(proof_rows.tolist(), proofs):
+        proofs_col[row] = proof
+
+    columns = {
+        "prompt": prompt_col,
+        "completion": completion_col,
+        "advantages": advantages_col,
+        "rewards": rewards_col,
+        "task_rewards": task_rewards_col,
+        "length_penalties": length_penalties_col,
+        "proofs": proofs_col,
+        "step": [step] * num_rows,
+        "target_lengths": target_lengths_col,
+        "task_type": task_type_col,
+    }
+    token_arrays = {
+        "input_tokens": _build_token_array(input_tokens_flat, input_tokens_offsets),
+        "output_tokens": _build_token_array(output_tokens_flat, output_tokens_offsets),
+    }
+    arrays = [token_arrays[name] if name in token_arrays else pa.array(columns[name], type=field_type) for name, field_type in _FIELD_TYPES]
+
+    return pa.Table.from_arrays(arrays, schema=pa_schema)
+
+
+def _build_token_offsets(lens: list[int]) -> np.ndarray:
+    """Turn per-row token counts into int32 list offsets with a single vectorized cumulative sum."""
+    offsets = np.zeros(len(lens) + 1, dtype=np.int64)
+    np.cumsum(lens, out=offsets[1:])
+    assert offsets[-1] <= np.iinfo(np.int32).max, f"Token count {offsets[-1]} overflows int32 list offsets"
+    return offsets.astype(np.int32)
+
+
+def _build_token_array(flat: array, offsets: np.ndarray) -> pa.ListArray:
+    """Build a list<int32> array from a flat token buffer and its row offsets without copying either."""
+    values = pa.array(np.frombuffer(flat, dtype=np.int32), type=pa.int32())
+    return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), values)
@@ -1,21 +1,59 @@
 import argparse
+import asyncio
+import functools
+import heapq
 import logging
 import multiprocessing as mp
 import os
+import shutil
 import time
 from pathlib import Path
 
 from shardcast import ClientNode
 
 POLL_INTERVAL = 5
+# Upper bound for the idle backoff between polls. While backed off, a newly published checkpoint can be picked up
+# up to MAX_POLL_INTERVAL - POLL_INTERVAL seconds later than with fixed polling, which delays inference waiting on it.
+# Set SHARDCAST_MAX_POLL_INTERVAL=5 to disable the backoff.
+MAX_POLL_INTERVAL = int(os.environ.get("SHARDCAST_MAX_POLL_INTERVAL", 30))
 WINDOW_SIZE = int(os.environ.get("SHARDCAST_WINDOW_SIZE", 2))  # Default window size is 2
 logger = logging.getLogger(__name__)
 
 
-def main(servers: list[str], output_dir: Path, versions_to_keep: int = -1, backlog_version: int = -1, window_size: int = WINDOW_SIZE):
+@functools.lru_cache(maxsize=4)
+def _get_client(servers: tuple[str, ...], output_dir: str) -> ClientNode:
+    """Return a ClientNode shared by all downloaders in this process for the same servers and output directory."""
+    return ClientNode(list(servers), output_dir)
+
+
+def _list_local_versions(output_dir: Path, versions: set[int]) -> set[int]:
+    """
+    Return the subset of versions whose model file is already present locally.
+
+    The step directories are listed with a single scandir (is_dir is served from the directory entry),
+    so only step directories of the requested versions are stat'ed for their model file.
+    """
+    try:
+        entries = list(os.scandir(output_dir))
+    except FileNotFoundError:
+        return set()
+    local_versions = set()
+    for entry in entries:
+        prefix, _, version = entry.name.partition("_")
+        if prefix != "step" or not version.isdigit() or int(version) not in versions or not entry.is_dir():
+            continue
+        if os.path.exists(os.path.join(entry.path, "model.safetensors")):
+            local_versions.add(int(version))
+    return local_versions
+
+
+async def amain(
+    servers: list[str], output_dir: Path, versions_to_keep: int = -1, backlog_version: int = -1, window_size: int = WINDOW_SIZE
+):
     """
     Download the latest versions of the model from the servers and delete expired versions.
     Versions will be saved as v{version}.safetensors in the output directory.
+    Up to window_size versions are downloaded concurrently.
 
     Args:
         servers: list of servers to download from
@@ -24,67 +62,111 @@ def main(servers: list[str], output_dir: Path, versions_to_keep: int = -1, backl
         backlog_version: version to attempt to get first
         window_size: number of latest versions to always try to prefetch
     """
-    client = ClientNode(servers, str(output_dir))
+    client = _get_client(tuple(servers), str(output_dir))
     logged_versions: set[int] = set()  # Track versions we've logged messages for
     missing_versions: set[int] = set()  # Track missing versions to retry
+    download_semaphore = asyncio.Semaphore(max(window_size, 1))
+    # Back off polling while the server has nothing new, and reset as soon as there is work to do
+    poll_interval = POLL_INTERVAL
+    last_latest_version: int | None = None
+
+    async def download_one(version: int, step_dir: Path) -> int | None:
+        """Download a single version and return it if it was stored locally."""
+        async with download_semaphore:
+            logger.info(f"Downloading version {version}")
+            start = time.time()
+            try:
+                filepath = await asyncio.to_thread(client.download_version, f"v{version}", str(step_dir / "model.safetensors"))
+                logger.info(f"Downloaded version {version} in {time.time() - start} seconds")
+                if filepath is not None:
+                    await asyncio.to_thread((step_dir / "stable").touch)
+                    missing_versions.discard(version)
+                    return version
+            except Exception as e:
+                logger.warning(f"Error downloading version {version}: {e}")
+                missing_versions.add(version)
+            return None
 
     while True:
-        available_versions = sorted([int(x[1:]) for x in client.list_available_versions().keys()])
-        if not available_versions:
+        parsed_versions = [int(x[1:]) for x in await asyncio.to_thread(client.list_available_versions)]
+        if not parsed_versions:
             if -1 not in logged_versions:
                 logger.warning("No versions available")
                 logged_versions.add(-1)
-            time.sleep(POLL_INTERVAL)
+            # Keep polling at the base interval: the first checkpoint is awaited by inference
+            await asyncio.sleep(POLL_INTERVAL)
             continue
         # Sliding window: always try to fetch the latest window_size versions
-        target_versions = set(available_versions[-window_size:])
+        available_set = set(parsed_versions)
+        latest_version = max(parsed_versions)
+        target_versions = set(heapq.nlargest(window_size, parsed_versions))
         if backlog_version != -1:
             target_versions.add(backlog_version)
-            backlog_version += 1
+            # Walk the backlog through published versions only; a backlog ahead of the server is held until published.
+            # Once it passes the latest version the sliding window covers everything newer, so stop tracking it.
+            if backlog_version <= latest_version:
+                backlog_version += 1
+                if backlog_version > latest_version:
+                    backlog_version = -1
+        # Drop missing versions the server has expired (older than its latest version but no longer advertised),
+        # versions too far ahead of the server, or versions that would be deleted right away, so the retry set stays bounded
+        missing_versions = {v for v in missing_versions if v in available_set or latest_version < v <= latest_version + window_size}
+        if versions_to_keep != -1:
+            missing_versions = {v for v in missing_versions if v > latest_version - versions_to_keep}
         # Add missing versions to the target set
         target_versions.update(missing_versions)
-        for version in sorted(target_versions):
-            safetensors_filepath = output_dir / f"step_{version}/model.safetensors"
-            if version not in available_versions:
+        local_versions = _list_local_versions(output_dir, target_versions)
+        downloads = []
+        # Visit versions lowest-first by popping from a min-heap instead of sorting the whole set
+        pending_versions = list(target_versions)
+        heapq.heapify(pending_versions)
+        while pending_versions:
+            version = heapq.heappop(pending_versions)
+            if version not in available_set:
                 if version not in logged_versions:
                     logger.warning(f"Version {version} not found on server")
                     logged_versions.add(version)
                 missing_versions.add(version)
                 continue
-            if safetensors_filepath.exists():
+            if version in local_versions:
                 if version not in logged_versions:
                     logger.info(f"Version {version} already exists locally")
                     logged_versions.add(version)
                 if version in missing_versions:
                     missing_versions.remove(version)
                 continue
-            logger.info(f"Downloading version {version}")
-            start = time.time()
-            try:
-                filepath = client.download_version(f"v{version}", str(safetensors_filepath))
-                logger.info(f"Downloaded version {version} in {time.time() - start} seconds")
-                if filepath is not None:
-                    (output_dir / f"step_{version}/stable").touch()
-                    if versions_to_keep != -1:
-                        try:
-                            logger.info(f"Deleting expired version {version - versions_to_keep}")
-                            expired_version = output_dir / f"step_{version - versions_to_keep}/model.safetensors"
-                            expired_version.unlink()
-                            (output_dir / f"step_{version - versions_to_keep}/stable").unlink()
-                        except FileNotFoundError:
-                            logger.warning(f"Expired version {version - versions_to_keep} not found")
-                        except Exception as e:
-                            logger.warning(f"Error deleting expired version {version - versions_to_keep}: {e}")
-                    if version in missing_versions:
-                        missing_versions.remove(version)
-            except Exception as e:
-                logger.warning(f"Error downloading version {version}: {e}")
-                missing_versions.add(version)
-        logger.info(f"Current available_versions: {available_versions}, target_versions: {sorted(target_versions)}, missing_versions: {sorted(missing_versions)}")
-        time.sleep(POLL_INTERVAL)
+            downloads.append(download_one(version, output_dir / f"step_{version}"))
+        results = await asyncio.gather(*downloads, return_exceptions=True)
+        # Expire old versions only once every download of this poll has finished, in ascending order,
+        # so a version that is still in flight can never be expired (and then recreated) underneath us
+        if versions_to_keep != -1:
+            for version in sorted(r for r in results if isinstance(r, int)):
+                expired_version = version - versions_to_keep
+                logger.info(f"Deleting expired version {expired_version}")
+                await asyncio.to_thread(shutil.rmtree, output_dir / f"step_{expired_version}", ignore_errors=True)
+        if logger.isEnabledFor(logging.INFO):
+            available_versions = sorted(parsed_versions)
+            logger.info(
+                f"Current available_versions: {available_versions}, target_versions: {sorted(target_versions)}, missing_versions: {sorted(missing_versions)}"
+            )
+        # Never back off while the backlog version is held waiting to be published, since inference is blocked on it
+        awaiting_backlog = backlog_version > latest_version
+        if downloads or awaiting_backlog or latest_version != last_latest_version:
+            poll_interval = POLL_INTERVAL
+        else:
+            poll_interval = min(poll_interval * 2, MAX_POLL_INTERVAL)
+        last_latest_version = latest_version
+        await asyncio.sleep(poll_interval)
+
+
+def main(servers: list[str], output_dir: Path, versions_to_keep: int = -1, backlog_version: int = -1, window_size: int = WINDOW_SIZE):
+    """Synchronous entrypoint running the downloader event loop until interrupted."""
+    asyncio.run(amain(servers, output_dir, versions_to_keep, backlog_version, window_size))
 
 
-def run_main_bg(servers: list[str], output_dir: Path, versions_to_keep: int = -1, backlog_version: int = -1, window_size: int = WINDOW_SIZE) -> mp.Process:
+def run_main_bg(
+    servers: list[str], output_dir: Path, versions_to_keep: int = -1, backlog_version: int = -1, window_size: int = WINDOW_SIZE
+) -> mp.Process:
     """
     Run the main function in a background process.
 
@@ -100,7 +182,9 @@ def run_main_bg(servers: list[str], output_dir: Path, versions_to_keep: int = -1
     """
     output_dir = Path(output_dir)
     logger.info(f"Starting shardcast downloader with {servers=}, {output_dir=}, {versions_to_keep=}, {backlog_version=}, {window_size=}")
-    process = mp.Process(target=main, args=(servers, output_dir, versions_to_keep, backlog_version, window_size))
+    # infer.py already sets the global start method to spawn; this only makes it explicit for other callers
+    ctx = mp.get_context("spawn")
+    process = ctx.Process(target=main, args=(servers, output_dir, versions_to_keep, backlog_version, window_size))
     process.start()
     return process
 
@@ -1,15 +1,40 @@
+import bisect
+import itertools
 from typing import Dict, List
 
 import torch
 
 import zeroband.training.envs as envs
 
+# Cached number of visible CUDA devices, probed at most once per process
+_CUDA_DEVICE_COUNT: int | None = None
+
+
+def _get_cuda_device_count() -> int:
+    global _CUDA_DEVICE_COUNT
+    if _CUDA_DEVICE_COUNT is None:
+        _CUDA_DEVICE_COUNT = torch.cuda.device_count() if torch.cuda.is_available() else 0
+    return _CUDA_DEVICE_COUNT
+
 
 class WorldInfo:
     """
     This class retrieves topology information for distributed training and inference settings by parsing environment variables, typically set by torchrun.
     """
 
+    __slots__ = (
+        "rank",
+        "world_size",
+        "local_rank",
+        "local_world_size",
+        "node_group_sizes",
+        "node_idx",
+        "num_nodes",
+        "gpu_ids",
+        "num_gpus",
+        "_cum_sizes",
+    )
+
     rank: int
     world_size: int
     local_rank: int
@@ -34,24 +59,21 @@ class WorldInfo:
 
         if self.node_group_sizes:
             assert sum(self.node_group_sizes) == self.world_size, "NODE_GROUP_SIZES must sum to WORLD_SIZE"
-            cumulative = 0
-            for idx, size in enumerate(self.node_group_sizes):
-                if self.rank < cumulative + size:
-                    self.local_rank = self.rank - cumulative
-                    self.local_world_size = size
-                    self.node_idx = idx
-                    break
-                cumulative += size
-            else:
+            self._cum_sizes = list(itertools.accumulate(self.node_group_sizes))
+            self.node_idx = bisect.bisect_right(self._cum_sizes, self.rank)
+            if self.node_idx >= len(self.node_group_sizes):
                 raise AssertionError("Rank out of range of NODE_GROUP_SIZES")
+            self.local_rank = self.rank - (self._cum_sizes[self.node_idx - 1] if self.node_idx else 0)
+            self.local_world_size = self.node_group_sizes[self.node_idx]
             self.num_nodes = len(self.node_group_sizes)
         else:
+            self._cum_sizes = None
             self.local_rank = local_rank if local_rank is not None else envs.LOCAL_RANK
             self.local_world_size = local_world_size if local_world_size is not None else envs.LOCAL_WORLD_SIZE
             self.num_nodes = self.world_size // self.local_world_size
             self.node_idx = self.rank // self.local_world_size
 
-        self.gpu_ids = envs.CUDA_VISIBLE_DEVICES or list(range(torch.cuda.device_count()))
+        self.gpu_ids = envs.CUDA_VISIBLE_DEVICES or list(range(_get_cuda_device_count()))
         self._check_world_info()
         self.num_gpus = len(self.gpu_ids)
 
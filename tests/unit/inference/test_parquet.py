@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pyarrow.parquet as pq
+
+from zeroband.inference.parquet import get_parquet_table
+from zeroband.inference.rewards import CompletionReward, RequestRewards
+from zeroband.utils.parquet import pa_schema
+
+STEP = 3
+
+# (request_id, prompt, prompt_token_ids, task_type, target_length, [(output_token_ids, reward)])
+REQUESTS = [
+    ("0", "p0", [1, 2, 3], "math", 10, [([4, 5], 1.0), ([6], 0.5)]),
+    ("1", "p1", [7], "code", 20, [([], 0.0), ([8, 9, 10], 0.25)]),
+    ("2", "p2", [], "math", 30, [([11, 12], 0.75)]),
+]
+
+
+def _make_inputs():
+    request_outputs, request_rewards, prompts, target_lengths = [], [], [], []
+    for request_id, prompt, prompt_token_ids, task_type, target_length, completions in REQUESTS:
+        outputs = [SimpleNamespace(index=i, token_ids=token_ids, text=f"c{request_id}{i}") for i, (token_ids, _) in enumerate(completions)]
+        rewards = [
+            CompletionReward(completion_id=i, reward=reward, task_reward=reward, length_penalty=-reward, advantage=reward - 0.5)
+            for i, (_, reward) in enumerate(completions)
+        ]
+        request_outputs.append(SimpleNamespace(request_id=request_id, prompt_token_ids=prompt_token_ids, outputs=outputs))
+        request_rewards.append(RequestRewards(request_id=request_id, rewards=rewards, task_type=task_type))
+        prompts.append(prompt)
+        target_lengths.append(target_length)
+    # Proofs are only generated for completions with more than one output token
+    proofs = [b"proof0", b"proof1", b"proof2"]
+    return request_outputs, request_rewards, prompts, proofs, STEP, target_lengths
+
+
+def _expected_rows():
+    rows = []
+    proof_iter = iter([b"proof0", b"proof1", b"proof2"])
+    for request_id, prompt, prompt_token_ids, task_type, target_length, completions in REQUESTS:
+        for i, (token_ids, reward) in enumerate(completions):
+            rows.append(
+                {
+                    "input_tokens": prompt_token_ids,
+                    "output_tokens": token_ids,
+                    "prompt": prompt,
+                    "completion": f"c{request_id}{i}",
+                    "advantages": reward - 0.5,
+                    "rewards": reward,
+                    "task_rewards": reward,
+                    "length_penalties": -reward,
+                    "proofs": next(proof_iter) if len(token_ids) > 1 else b"",
+                    "step": STEP,
+                    "target_lengths": target_length,
+                    "task_type": task_type,
+                }
+            )
+    return rows
+
+
+def test_get_parquet_table():
+    table = get_parquet_table(*_make_inputs())
+    assert table.schema.equals(pa_schema)
+    assert table.to_pylist() == _expected_rows()
+
+
+def test_get_parquet_table_write(tmp_path):
+    path = tmp_path / "batch.parquet"
+    pq.write_table(get_parquet_table(*_make_inputs()), path)
+    assert pq.read_schema(path).equals(pa_schema)
+    assert pq.read_table(path).to_pylist() == _expected_rows()
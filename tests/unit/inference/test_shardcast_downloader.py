@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+
+import pytest
+
+import zeroband.inference.shardcast_downloader as shardcast_downloader
+
+
+class FakeClientNode:
+    """Fake shardcast client that publishes versions according to a per-poll schedule."""
+
+    def __init__(self, schedule: list[list[int]]):
+        self.schedule = schedule
+        self.polls = 0
+        self.downloaded: list[int] = []
+
+    def list_available_versions(self) -> dict[str, str]:
+        versions = self.schedule[min(self.polls, len(self.schedule) - 1)]
+        self.polls += 1
+        return {f"v{v}": "checksum|1" for v in versions}
+
+    def download_version(self, version: str, output_file: str) -> str:
+        self.downloaded.append(int(version[1:]))
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, "wb") as f:
+            f.write(b"weights")
+        return output_file
+
+
+class StopPolling(Exception):
+    pass
+
+
+def run_downloader(monkeypatch, tmp_path, client: FakeClientNode, num_polls: int, **kwargs) -> list[float]:
+    """Run the downloader loop against the fake client for num_polls polls and return the requested sleep intervals."""
+    sleeps = []
+
+    async def fake_sleep(seconds: float):
+        sleeps.append(seconds)
+        if len(sleeps) >= num_polls:
+            raise StopPolling
+
+    monkeypatch.setattr(shardcast_downloader, "_get_client", lambda servers, output_dir: client)
+    monkeypatch.setattr(shardcast_downloader.asyncio, "sleep", fake_sleep)
+    with pytest.raises(StopPolling):
+        asyncio.run(shardcast_downloader.amain(["server"], tmp_path, **kwargs))
+    return sleeps
+
+
+def test_backlog_does_not_run_ahead_of_server(monkeypatch, tmp_path, caplog):
+    client = FakeClientNode([list(range(1, 8))])
+    with caplog.at_level(logging.WARNING, logger=shardcast_downloader.__name__):
+        run_downloader(monkeypatch, tmp_path, client, num_polls=50, backlog_version=1, window_size=2)
+    assert sorted(client.downloaded) == list(range(1, 8))
+    assert not [r for r in caplog.records if "not found on server" in r.getMessage()]
+
+
+def test_backlog_ahead_of_server_is_held_until_published(monkeypatch, tmp_path, caplog):
+    # Version 10 is published after 20 polls, together with newer versions that push it out of the sliding window
+    client = FakeClientNode([[1, 2, 3]] * 20 + [[1, 2, 3, 10, 11, 12]])
+    with caplog.at_level(logging.WARNING, logger=shardcast_downloader.__name__):
+        run_downloader(monkeypatch, tmp_path, client, num_polls=25, backlog_version=10, window_size=2)
+    assert 10 in client.downloaded
+    not_found = {r.getMessage() for r in caplog.records if "not found on server" in r.getMessage()}
+    assert not_found == {"Version 10 not found on server"}
+
+
+def test_poll_backoff(monkeypatch, tmp_path):
+    # Nothing new for 6 polls after the initial download, then a new version is published
+    client = FakeClientNode([[1, 2]] * 7 + [[1, 2, 3]] * 2)
+    sleeps = run_downloader(monkeypatch, tmp_path, client, num_polls=9, window_size=2)
+    base, cap = shardcast_downloader.POLL_INTERVAL, shardcast_downloader.MAX_POLL_INTERVAL
+    expected = [base]
+    for _ in range(6):
+        expected.append(min(expected[-1] * 2, cap))
+    expected += [base, base * 2]
+    assert sleeps == expected
+
+
+def test_no_poll_backoff_while_backlog_is_held(monkeypatch, tmp_path):
+    client = FakeClientNode([[1, 2, 3]])
+    sleeps = run_downloader(monkeypatch, tmp_path, client, num_polls=10, backlog_version=10, window_size=2)
+    assert sleeps == [shardcast_downloader.POLL_INTERVAL] * 10
+
+
+def test_no_poll_backoff_before_first_version(monkeypatch, tmp_path):
+    client = FakeClientNode([[]])
+    sleeps = run_downloader(monkeypatch, tmp_path, client, num_polls=10, backlog_version=1)
+    assert sleeps == [shardcast_downloader.POLL_INTERVAL] * 10
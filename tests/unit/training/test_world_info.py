@@ -89,3 +89,28 @@ def test_init_with_node_group_sizes():
     assert world_info.local_rank == 1
     assert world_info.num_nodes == 3
     assert world_info == get_world_info()
+
+
+@pytest.mark.parametrize(
+    "node_group_sizes,rank,node_idx,local_rank",
+    [
+        ("2,3,2", 0, 0, 0),
+        ("2,3,2", 1, 0, 1),
+        ("2,3,2", 2, 1, 0),
+        ("2,3,2", 4, 1, 2),
+        ("2,3,2", 5, 2, 0),
+        ("2,3,2", 6, 2, 1),
+        ("2,0,2", 1, 0, 1),
+        ("2,0,2", 2, 2, 0),
+        ("2,0,2", 3, 2, 1),
+    ],
+)
+def test_init_with_node_group_sizes_all_ranks(node_group_sizes: str, rank: int, node_idx: int, local_rank: int):
+    sizes = list(map(int, node_group_sizes.split(",")))
+    os.environ["RANK"] = str(rank)
+    os.environ["WORLD_SIZE"] = str(sum(sizes))
+    os.environ["NODE_GROUP_SIZES"] = node_group_sizes
+    world_info = get_world_info()
+    assert world_info.node_idx == node_idx
+    assert world_info.local_rank == local_rank
+    assert world_info.local_world_size == sizes[node_idx]